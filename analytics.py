@@ -0,0 +1,186 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from prepare_data import DAY_ORDER
+
+
+# ================= DATES =================
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def to_epoch_day(d):
+    # datetime.date -> int days since 1970-01-01
+    return int((np.datetime64(d, "D") - EPOCH).astype(np.int32))
+
+
+def from_epoch_day(n):
+    # int days since 1970-01-01 -> datetime.date
+    return (EPOCH + np.timedelta64(int(n), "D")).astype(object)
+
+
+# ================= EDA AGGREGATES =================
+SEVERITY_LEVELS = 5  # severity count arrays cover at least levels 0..4
+
+@dataclass
+class EdaAggregates:
+    hour: np.ndarray    # counts for hours 0..23
+    day: np.ndarray     # counts per day, in DAY_ORDER (Monday..Sunday)
+    month: np.ndarray   # counts for months 1..12
+    state: np.ndarray   # counts per State category
+    state_names: list   # State category labels, aligned with `state`
+    severity: np.ndarray  # counts indexed by Severity level
+
+
+def category_counts(col):
+    # ✅ Count integer category codes directly (missing values have code -1)
+    codes = col.cat.codes.to_numpy()
+    return np.bincount(codes[codes >= 0], minlength=len(col.cat.categories))
+
+
+def by_day_order(counts, day_names):
+    # Reindex per-category day counts to DAY_ORDER by name (absent days count 0)
+    idx = pd.Index(day_names).get_indexer(DAY_ORDER)
+    return np.where(idx >= 0, np.asarray(counts)[idx], 0)
+
+
+def n_categories(col):
+    # Distinct non-missing values present, from the code counts
+    return int(np.count_nonzero(category_counts(col)))
+
+
+def eda_aggregates(df):
+    return EdaAggregates(
+        hour=np.bincount(df["Hour"].values, minlength=24),
+        day=by_day_order(category_counts(df["Day"]), df["Day"].cat.categories),
+        month=np.bincount(df["Month"].values, minlength=13)[1:],
+        state=category_counts(df["State"]),
+        state_names=list(df["State"].cat.categories),
+        severity=np.bincount(df["Severity"].values, minlength=SEVERITY_LEVELS),
+    )
+
+
+# ================= COUNT CUBE =================
+@dataclass
+class CountCube:
+    counts: np.ndarray  # int32 counts over (State, Hour, Month, Day, Severity)
+    state_names: list   # State category labels; last State slot holds missing states
+    day_names: list     # Day category labels
+
+
+def build_count_cube(df):
+    # ✅ Early aggregation: one pass over the unfiltered rows into a small dense cube
+    states = df["State"].cat.categories
+    s = df["State"].cat.codes.to_numpy()
+    s = np.where(s < 0, len(states), s)
+    d = df["Day"].cat.codes.to_numpy()
+    sev = df["Severity"].to_numpy()
+
+    # Severity axis has at least SEVERITY_LEVELS slots, matching eda_aggregates()
+    n_sev = max(int(sev.max(initial=0)) + 1, SEVERITY_LEVELS)
+    shape = (len(states) + 1, 24, 13, len(df["Day"].cat.categories), n_sev)
+    flat = np.ravel_multi_index((s, df["Hour"].values, df["Month"].values, d, sev), shape)
+    counts = np.bincount(flat, minlength=np.prod(shape)).astype(np.int32).reshape(shape)
+
+    return CountCube(counts, list(states), list(df["Day"].cat.categories))
+
+
+def cube_aggregates(cube, state, severity, day, hour_range, month_range):
+    n_states, _, _, n_days, n_sev = cube.counts.shape
+
+    s_idx = pd.Index(cube.state_names).get_indexer(state) if state else np.arange(n_states)
+    d_idx = pd.Index(cube.day_names).get_indexer(day) if day else np.arange(n_days)
+    sev_idx = np.asarray(severity, dtype=np.intp) if severity else np.arange(n_sev)
+    h_idx = np.arange(hour_range[0], hour_range[1] + 1)
+    m_idx = np.arange(month_range[0], month_range[1] + 1)
+
+    s_idx = s_idx[s_idx >= 0]
+    d_idx = d_idx[d_idx >= 0]
+    sev_idx = sev_idx[(sev_idx >= 0) & (sev_idx < n_sev)]
+
+    sub = cube.counts[np.ix_(s_idx, h_idx, m_idx, d_idx, sev_idx)]
+
+    hour = np.zeros(24, dtype=np.int64)
+    hour[h_idx] = sub.sum(axis=(0, 2, 3, 4))
+    month = np.zeros(13, dtype=np.int64)
+    month[m_idx] = sub.sum(axis=(0, 1, 3, 4))
+    day_counts = np.zeros(n_days, dtype=np.int64)
+    day_counts[d_idx] = sub.sum(axis=(0, 1, 2, 4))
+    state_counts = np.zeros(n_states, dtype=np.int64)
+    state_counts[s_idx] = sub.sum(axis=(1, 2, 3, 4))
+    sev_counts = np.zeros(n_sev, dtype=np.int64)
+    sev_counts[sev_idx] = sub.sum(axis=(0, 1, 2, 3))
+
+    return EdaAggregates(
+        hour=hour,
+        day=by_day_order(day_counts, cube.day_names),
+        month=month[1:],
+        state=state_counts[:-1],
+        state_names=cube.state_names,
+        severity=sev_counts,
+    )
+
+
+# ================= TOP CATEGORIES =================
+def top_categories(col, n):
+    # ✅ bincount on codes + argpartition instead of hash-based value_counts
+    counts = category_counts(col)
+    top = np.arange(len(counts))
+    if n < len(counts):
+        top = np.argpartition(-counts, n - 1)[:n]
+    top = top[np.argsort(-counts[top], kind="stable")]
+
+    index = pd.Index(col.cat.categories[top], name=col.name)
+    return pd.Series(counts[top], index=index, name="count")
+
+
+# ================= CORRELATION =================
+def correlation_matrix(df, cols):
+    # ✅ One contiguous float32 array, one NaN mask, one np.corrcoef call
+    arr = np.ascontiguousarray(df[cols].to_numpy(dtype=np.float32, copy=False))
+    arr = arr[~np.isnan(arr).any(axis=1)]
+    if len(arr) == 0:
+        return None
+
+    corr = np.corrcoef(arr, rowvar=False)
+    return pd.DataFrame(corr, index=cols, columns=cols)
+
+
+# ================= HEATMAP GRID =================
+def heat_grid(lat, lng, cell_deg=0.05, max_cells=4000):
+    # ✅ Aggregate points into fixed-size lat/lng cells; returns [lat, lng, count] per
+    # non-empty cell. Cells double in size until at most `max_cells` remain.
+    # Rows with a missing lat or lng are ignored.
+    keep = ~(np.isnan(lat) | np.isnan(lng))
+    lat, lng = lat[keep], lng[keep]
+    if len(lat) == 0:
+        return []
+
+    while True:
+        iy = np.floor(lat / cell_deg).astype(np.int64)
+        ix = np.floor(lng / cell_deg).astype(np.int64)
+        y0, x0 = iy.min(), ix.min()
+        width = ix.max() - x0 + 1
+        cells, counts = np.unique((iy - y0) * width + (ix - x0), return_counts=True)
+        if len(cells) <= max_cells:
+            break
+        cell_deg *= 2
+
+    # Raw counts as weights: each accident still adds 1, as with unaggregated points
+    return np.column_stack([
+        (cells // width + y0 + 0.5) * cell_deg,
+        (cells % width + x0 + 0.5) * cell_deg,
+        counts,
+    ]).tolist()
+
+
+# ================= MAP SAMPLE =================
+def sample_points(df, n, seed=42):
+    # (N, 2) float32 lat/lng array, at most n rows, NaN rows dropped
+    arr = df[["Start_Lat", "Start_Lng"]].to_numpy(np.float32)
+    arr = arr[~np.isnan(arr).any(axis=1)]
+    if len(arr) > n:
+        idx = np.random.default_rng(seed).choice(len(arr), size=n, replace=False)
+        arr = arr[idx]
+    return arr
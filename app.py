@@ -1,12 +1,29 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import folium
-from folium.plugins import MarkerCluster, HeatMap
-from streamlit_folium import st_folium
 import plotly.express as px
-import seaborn as sns
-import matplotlib.pyplot as plt
+import plotly.io as pio
+
+from analytics import (
+    build_count_cube,
+    correlation_matrix,
+    cube_aggregates,
+    eda_aggregates,
+    from_epoch_day,
+    heat_grid,
+    n_categories,
+    sample_points,
+    to_epoch_day,
+    top_categories,
+)
+from prepare_data import (
+    PARQUET_PATH,
+    USED_COLS,
+    CATEGORY_COLS,
+    DAY_ORDER,
+    build_parquet,
+    parquet_is_stale,
+)
 
 # ================= PAGE CONFIG =================
 st.set_page_config(
@@ -16,24 +33,49 @@ st.set_page_config(
 )
 
 # ================= LOAD DATA =================
-@st.cache_data
+# ✅ Singleton cache: the base frame is shared across reruns/sessions without
+# pickling or hashing it. Treat it as read-only.
+@st.cache_resource(show_spinner=False)
 def load_data():
-    df = pd.read_csv("data/cleaned/US_Accidents_cleaned_sample_milestone1.csv")
-    df["Start_Time"] = pd.to_datetime(df["Start_Time"], errors="coerce")
+    # ✅ Build the Parquet copy once (and again if the CSV or build schema changed);
+    # later loads skip CSV parsing entirely
+    if parquet_is_stale():
+        build_parquet()
+
+    df = pd.read_parquet(PARQUET_PATH, columns=USED_COLS, engine="pyarrow")
 
-    df["Date"] = df["Start_Time"].dt.date
-    df["Hour"] = df["Start_Time"].dt.hour
-    df["Month"] = df["Start_Time"].dt.month
-    df["Day"] = df["Start_Time"].dt.day_name()
+    # ✅ Reduce memory for faster filtering (no-op when Parquet already decoded them)
+    for col in CATEGORY_COLS:
+        df[col] = df[col].astype("category")
+
+        # ✅ Arrow-backed category labels; the integer codes stay NumPy for the filter/count kernels
+        labels = df[col].cat.categories.astype("string[pyarrow]")
+        df[col] = pd.Categorical.from_codes(df[col].cat.codes, dtype=pd.CategoricalDtype(labels))
+
+    # ✅ Date as int32 days since epoch so the date filter is a plain integer compare
+    df["Date"] = df["Start_Time"].values.astype("datetime64[D]").astype(np.int32)
     return df
 
 df = load_data()
 
-# ✅ Reduce memory for faster filtering
-df["State"] = df["State"].astype("category")
-df["City"] = df["City"].astype("category")
-df["Weather_Condition"] = df["Weather_Condition"].astype("category")
-df["Day"] = df["Day"].astype("category")
+# ✅ Pre-aggregated (State, Hour, Month, Day, Severity) counts over the unfiltered data
+@st.cache_resource(show_spinner=False)
+def load_count_cube(_df):
+    return build_count_cube(_df)
+
+count_cube = load_count_cube(df)
+
+# ✅ Sidebar choices computed once; category labels are already sorted and unique
+@st.cache_resource(show_spinner=False)
+def sidebar_options(_df):
+    return (
+        list(_df["State"].cat.categories),
+        sorted(_df["Severity"].unique().tolist()),
+        list(_df["Weather_Condition"].cat.categories),
+        from_epoch_day(_df["Date"].values.min()),
+        from_epoch_day(_df["Date"].values.max()),
+        frozenset(_df["State"].cat.categories),
+    )
 
 # ================= TITLE =================
 st.title("🚦 Road Accident Analytics Dashboard")
@@ -42,12 +84,7 @@ st.markdown("### 📊 Advanced Exploratory Data Analysis & Visual Insights")
 # ================= SIDEBAR FILTERS (AUTO APPLY) =================
 st.sidebar.header("🔎 Filters")
 
-all_states = sorted(df["State"].dropna().unique())
-all_severity = sorted(df["Severity"].unique())
-all_weather = sorted(df["Weather_Condition"].dropna().unique())
-
-min_date = df["Date"].min()
-max_date = df["Date"].max()
+all_states, all_severity, all_weather, min_date, max_date, all_states_set = sidebar_options(df)
 
 state = st.sidebar.multiselect(
     "State",
@@ -67,7 +104,7 @@ weather = st.sidebar.multiselect(
 
 day = st.sidebar.multiselect(
     "Day of Week",
-    ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    DAY_ORDER
 )
 
 date_range = st.sidebar.date_input(
@@ -86,115 +123,236 @@ if isinstance(date_range, tuple) and len(date_range) == 2:
 else:
     start_date, end_date = min_date, max_date
 
-# ================= APPLY FILTERS (CACHED) =================
-@st.cache_data
-def get_filtered_data(df, state, severity, weather, day, hour_range, month_range, start_date, end_date):
-    filtered_df = df.copy()
+# Small hashable key for the current sidebar selection
+filter_key = hash((
+    tuple(state), tuple(severity), tuple(weather), tuple(day),
+    hour_range, month_range, start_date, end_date
+))
 
-    # Date filter
-    filtered_df = filtered_df[
-        (filtered_df["Date"] >= start_date) &
-        (filtered_df["Date"] <= end_date)
-    ]
+# ================= APPLY FILTERS (CACHED) =================
+def _in_range(values, lo, hi):
+    # ✅ One subtract + one unsigned compare: values below lo wrap around past hi - lo
+    return (values.view(np.uint8) - np.uint8(lo)) <= np.uint8(hi - lo)
+
+def _codes_isin(col, values):
+    # Compare integer category codes instead of the category values
+    wanted = pd.Categorical(values, categories=col.cat.categories).codes
+    # Unknown labels map to -1, the same code as missing values; drop them
+    wanted = wanted[wanted >= 0]
+    return col.cat.codes.isin(wanted).to_numpy()
+
+# Bounded so a long-running server doesn't keep one entry per sidebar combination forever
+FILTER_CACHE_ENTRIES = 32
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def _filter_positions(_df, state, severity, weather, day, hour_range, month_range, start_date, end_date):
+    # ✅ `_df` is skipped when hashing the cache key; only the filter values are hashed.
+    # The shared base frame is only read here, never modified.
+    # ✅ Only the int32 row positions are cached, not a pickled copy of the filtered frame
+
+    # ✅ Build one boolean mask and slice once at the end
+    dates = _df["Date"].values
+    mask = (dates >= to_epoch_day(start_date)) & (dates <= to_epoch_day(end_date))
 
     if state:
-        filtered_df = filtered_df[filtered_df["State"].isin(state)]
+        mask &= _codes_isin(_df["State"], state)
     if severity:
-        filtered_df = filtered_df[filtered_df["Severity"].isin(severity)]
+        mask &= np.isin(_df["Severity"].values, severity)
     if weather:
-        filtered_df = filtered_df[filtered_df["Weather_Condition"].isin(weather)]
+        mask &= _codes_isin(_df["Weather_Condition"], weather)
     if day:
-        filtered_df = filtered_df[filtered_df["Day"].isin(day)]
+        mask &= _codes_isin(_df["Day"], day)
+
+    mask &= _in_range(_df["Hour"].values, *hour_range)
+    mask &= _in_range(_df["Month"].values, *month_range)
+
+    return np.flatnonzero(mask).astype(np.int32)
+
+def get_filtered_data(_df, state, severity, weather, day, hour_range, month_range, start_date, end_date):
+    # ✅ Selection covers the whole domain: hand back the shared (read-only) base frame
+    if (
+        (not state or set(state) == all_states_set)
+        and not severity
+        and not weather
+        and not day
+        and tuple(hour_range) == (0, 23)
+        and tuple(month_range) == (1, 12)
+        and start_date <= min_date
+        and end_date >= max_date
+    ):
+        return _df
+
+    idx = _filter_positions(_df, state, severity, weather, day, hour_range, month_range, start_date, end_date)
+    return _df.iloc[idx]
 
-    filtered_df = filtered_df[
-        (filtered_df["Hour"].between(hour_range[0], hour_range[1])) &
-        (filtered_df["Month"].between(month_range[0], month_range[1]))
-    ]
+filtered_df = get_filtered_data(df, state, severity, weather, day, hour_range, month_range, start_date, end_date)
 
-    return filtered_df
+# ================= AGGREGATES (CACHED) =================
+# ✅ All Tab 1 group counts in one cached pass over the filtered frame
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def get_eda_aggregates(_df, filter_key):
+    return eda_aggregates(_df)
 
-filtered_df = get_filtered_data(df, state, severity, weather, day, hour_range, month_range, start_date, end_date)
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def get_cube_aggregates(state, severity, day, hour_range, month_range):
+    return cube_aggregates(count_cube, state, severity, day, hour_range, month_range)
+
+# ✅ Without weather/date filters the count cube answers Tab 1 without touching rows
+if not weather and start_date == min_date and end_date == max_date:
+    eda_agg = get_cube_aggregates(state, severity, day, hour_range, month_range)
+else:
+    eda_agg = get_eda_aggregates(filtered_df, filter_key)
+
+CORR_COLS = [
+    "Severity",
+    "Visibility(mi)",
+    "Temperature(F)",
+    "Wind_Speed(mph)"
+]
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def get_correlation(_df, filter_key):
+    return correlation_matrix(_df, CORR_COLS)
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def get_heat_points(_df, filter_key):
+    return heat_grid(_df["Start_Lat"].to_numpy(), _df["Start_Lng"].to_numpy())
+
+# ✅ Fixed sample per (filter, size) instead of re-sampling on every rerun
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def get_map_sample(_df, filter_key, n):
+    return sample_points(_df, n)
 
 # ================= METRICS =================
 st.subheader("📌 Key Metrics")
 
 c1, c2, c3, c4, c5 = st.columns(5)
 c1.metric("Total Accidents", f"{len(filtered_df):,}")
-c2.metric("Average Severity", round(filtered_df["Severity"].mean(), 2) if len(filtered_df) > 0 else 0)
-c3.metric("States Covered", filtered_df["State"].nunique())
-c4.metric("Cities Covered", filtered_df["City"].nunique())
-c5.metric("Weather Types", filtered_df["Weather_Condition"].nunique())
-
-# ================= TABS =================
-tab1, tab2, tab3, tab4, tab5 = st.tabs(
-    ["📈 EDA Analysis", "🗺️ Accident Maps", "🌦 Weather Analysis", "📊 Correlation", "📌 Help"]
-)
 
-# ================= TAB 1 : EDA =================
-with tab1:
-    st.subheader("Severity Distribution")
-    fig1 = px.histogram(
-        filtered_df,
+if len(filtered_df) > 0:
+    c2.metric("Average Severity", round(float(filtered_df["Severity"].values.mean()), 2))
+    c3.metric("States Covered", n_categories(filtered_df["State"]))
+    c4.metric("Cities Covered", n_categories(filtered_df["City"]))
+    c5.metric("Weather Types", n_categories(filtered_df["Weather_Condition"]))
+else:
+    c2.metric("Average Severity", 0)
+    c3.metric("States Covered", 0)
+    c4.metric("Cities Covered", 0)
+    c5.metric("Weather Types", 0)
+
+# ================= FIGURES (CACHED) =================
+# ✅ Figure specs are memoized as JSON on small aggregate tuples
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def fig_severity(counts):
+    # ✅ Bars from pre-binned counts; the browser no longer bins raw rows
+    levels = np.flatnonzero(counts)
+    return px.bar(
+        pd.DataFrame({"Severity": levels.astype(str), "Count": np.asarray(counts)[levels]}),
         x="Severity",
+        y="Count",
         color="Severity",
         template="plotly_dark"
-    )
-    st.plotly_chart(fig1, use_container_width=True)
+    ).to_json()
 
-    st.subheader("Accidents by Hour")
-    fig2 = px.line(
-        filtered_df.groupby("Hour").size().reset_index(name="Count"),
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def fig_hour(counts):
+    return px.line(
+        pd.DataFrame({"Hour": np.arange(24), "Count": counts}),
         x="Hour",
         y="Count",
         markers=True,
+        render_mode="webgl",
         template="plotly_dark"
-    )
-    st.plotly_chart(fig2, use_container_width=True)
+    ).to_json()
 
-    st.subheader("Accidents by Day of Week")
-    fig3 = px.bar(
-        filtered_df.groupby("Day").size().reindex(
-            ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        ).reset_index(name="Count"),
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def fig_day(counts):
+    return px.bar(
+        pd.DataFrame({"Day": DAY_ORDER, "Count": counts}),
         x="Day",
         y="Count",
         template="plotly_dark"
-    )
-    st.plotly_chart(fig3, use_container_width=True)
+    ).to_json()
 
-    st.subheader("Accidents by Month")
-    fig4 = px.bar(
-        filtered_df.groupby("Month").size().reset_index(name="Count"),
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def fig_month(counts):
+    return px.bar(
+        pd.DataFrame({"Month": np.arange(1, 13), "Count": counts}),
         x="Month",
         y="Count",
         template="plotly_dark"
-    )
-    st.plotly_chart(fig4, use_container_width=True)
+    ).to_json()
 
-    st.subheader("Top 15 Accident-Prone States")
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def fig_top_states(names, counts):
     state_counts = (
-        filtered_df.groupby("State")
-        .size()
-        .reset_index(name="Accident Count")
+        pd.DataFrame({"State": names, "Accident Count": counts})
         .sort_values("Accident Count", ascending=False)
         .head(15)
     )
 
-    fig5 = px.bar(
+    return px.bar(
         state_counts,
         x="State",
         y="Accident Count",
         color="Accident Count",
         template="plotly_dark"
-    )
-    st.plotly_chart(fig5, use_container_width=True)
+    ).to_json()
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def fig_weather(names, counts):
+    return px.bar(
+        pd.Series(counts, index=pd.Index(names, name="Weather_Condition"), name="count"),
+        template="plotly_dark"
+    ).to_json()
+
+def show_figure(fig_json):
+    st.plotly_chart(pio.from_json(fig_json), use_container_width=True)
+
+# ================= TABS =================
+# ✅ Each tab body is a fragment: its own widgets rerun only that tab
+tab1, tab2, tab3, tab4, tab5 = st.tabs(
+    ["📈 EDA Analysis", "🗺️ Accident Maps", "🌦 Weather Analysis", "📊 Correlation", "📌 Help"]
+)
+
+# ================= TAB 1 : EDA =================
+@st.fragment
+def render_eda_tab(agg):
+    st.subheader("Severity Distribution")
+    show_figure(fig_severity(tuple(agg.severity.tolist())))
+
+    st.subheader("Accidents by Hour")
+    show_figure(fig_hour(tuple(agg.hour.tolist())))
+
+    st.subheader("Accidents by Day of Week")
+    show_figure(fig_day(tuple(agg.day.tolist())))
+
+    st.subheader("Accidents by Month")
+    show_figure(fig_month(tuple(agg.month.tolist())))
+
+    st.subheader("Top 15 Accident-Prone States")
+    show_figure(fig_top_states(tuple(agg.state_names), tuple(agg.state.tolist())))
+
+with tab1:
+    render_eda_tab(eda_agg)
 
 # ================= TAB 2 : MAPS (OPTIMIZED) =================
-with tab2:
-    st.subheader("🗺️ Accident Maps (Optimized)")
+CIRCLE_MARKER_JS = """
+function (row) {
+    return L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 3, color: "red", fill: true, fillOpacity: 0.6
+    });
+};
+"""
+
+@st.fragment
+def render_map_tab(filtered_df, filter_key):
+    # ✅ Map libraries are imported only when the map tab renders
+    import folium
+    from folium.plugins import FastMarkerCluster, HeatMap
+    from streamlit_folium import st_folium
 
-    # ✅ Reduce lag by limiting map points
-    map_points = st.slider("Map Points (Reduce for faster loading)", 500, 4000, 1500, step=500)
+    st.subheader("🗺️ Accident Maps (Optimized)")
 
     map_view = st.radio(
         "Map View",
@@ -202,62 +360,81 @@ with tab2:
         horizontal=True
     )
 
-    map_df = filtered_df.dropna(subset=["Start_Lat", "Start_Lng"])
+    # ✅ Reduce lag by limiting map points (marker clusters only; the heatmap is pre-aggregated).
+    # Always rendered (disabled for the heatmap) so Streamlit keeps the chosen value.
+    map_points = st.slider(
+        "Map Points (Reduce for faster loading)",
+        500, 4000, 1500,
+        step=500,
+        disabled=map_view != "Marker Clusters"
+    )
+
+    # ✅ Both views read cached arrays; NaN coordinates are dropped inside the helpers
+    if map_view == "Hotspots Heatmap":
+        heat_points = get_heat_points(filtered_df, filter_key)
+        if len(heat_points) == 0:
+            st.warning("No map data available for selected filters.")
+            return
+
+        st.subheader("🔥 Accident Hotspots Heatmap")
 
-    if len(map_df) > map_points:
-        map_df = map_df.sample(n=map_points, random_state=42)
+        # Centre on the count-weighted mean of the heat cells
+        cells = np.asarray(heat_points)
+        center = np.average(cells[:, :2], axis=0, weights=cells[:, 2])
+
+        heat_map = folium.Map(
+            location=center.tolist(),
+            zoom_start=5,
+            tiles="CartoDB dark_matter",
+            prefer_canvas=True
+        )
+
+        # ✅ Count-weighted grid cells over all points instead of a random sample
+        HeatMap(
+            heat_points,
+            radius=12,
+            blur=15
+        ).add_to(heat_map)
+
+        # ✅ Canvas rendering + no map state sent back to Python; fixed key avoids remounts
+        st_folium(heat_map, height=550, width="100%", returned_objects=[], key="acc_map")
 
-    if len(map_df) == 0:
-        st.warning("No map data available for selected filters.")
     else:
-        if map_view == "Hotspots Heatmap":
-            st.subheader("🔥 Accident Hotspots Heatmap")
-
-            heat_map = folium.Map(
-                location=[map_df["Start_Lat"].mean(), map_df["Start_Lng"].mean()],
-                zoom_start=5,
-                tiles="CartoDB dark_matter"
-            )
-
-            HeatMap(
-                map_df[["Start_Lat", "Start_Lng"]].values.tolist(),
-                radius=12,
-                blur=15
-            ).add_to(heat_map)
-
-            st_folium(heat_map, height=550, width="100%")
-
-        else:
-            st.subheader("📍 Marker Cluster Map")
-
-            m = folium.Map(
-                location=[map_df["Start_Lat"].mean(), map_df["Start_Lng"].mean()],
-                zoom_start=5,
-                tiles="CartoDB positron"
-            )
-
-            cluster = MarkerCluster().add_to(m)
-            for _, row in map_df.iterrows():
-                folium.CircleMarker(
-                    location=[row["Start_Lat"], row["Start_Lng"]],
-                    radius=3,
-                    color="red",
-                    fill=True,
-                    fill_opacity=0.6
-                ).add_to(cluster)
-
-            st_folium(m, height=550, width="100%")
+        points = get_map_sample(filtered_df, filter_key, map_points)
+        if len(points) == 0:
+            st.warning("No map data available for selected filters.")
+            return
+
+        st.subheader("📍 Marker Cluster Map")
+
+        m = folium.Map(
+            location=points.mean(axis=0).tolist(),
+            zoom_start=5,
+            tiles="CartoDB positron",
+            prefer_canvas=True
+        )
+
+        # ✅ One JSON array of points; Leaflet builds the circle markers client-side
+        FastMarkerCluster(
+            points.tolist(),
+            callback=CIRCLE_MARKER_JS,
+            name="accidents"
+        ).add_to(m)
+
+        st_folium(m, height=550, width="100%", returned_objects=[], key="acc_map")
+
+with tab2:
+    render_map_tab(filtered_df, filter_key)
 
 # ================= TAB 3 : WEATHER =================
-with tab3:
+@st.fragment
+def render_weather_tab(filtered_df):
     st.subheader("Weather Condition Distribution")
-    fig6 = px.bar(
-        filtered_df["Weather_Condition"].value_counts().head(15),
-        template="plotly_dark"
-    )
-    st.plotly_chart(fig6, use_container_width=True)
+    top_weather = top_categories(filtered_df["Weather_Condition"], 15)
+    show_figure(fig_weather(tuple(top_weather.index), tuple(top_weather.tolist())))
 
     st.subheader("Severity vs Weather")
+    # Built from raw rows, so not memoized: a cached copy would be row-sized per selection
     fig7 = px.box(
         filtered_df,
         x="Weather_Condition",
@@ -266,30 +443,33 @@ with tab3:
     )
     st.plotly_chart(fig7, use_container_width=True)
 
+with tab3:
+    render_weather_tab(filtered_df)
+
 # ================= TAB 4 : CORRELATION =================
-with tab4:
+@st.fragment
+def render_correlation_tab(filtered_df, filter_key):
     st.subheader("Correlation Heatmap")
 
-    corr_cols = [
-        "Severity",
-        "Visibility(mi)",
-        "Temperature(F)",
-        "Wind_Speed(mph)"
-    ]
-
-    corr_df = filtered_df[corr_cols].dropna()
+    corr = get_correlation(filtered_df, filter_key)
 
-    if len(corr_df) == 0:
+    if corr is None:
         st.warning("Not enough data available for correlation heatmap.")
     else:
-        corr = corr_df.corr()
+        # ✅ Matplotlib/seaborn are imported only when a heatmap is drawn
+        import matplotlib.pyplot as plt
+        import seaborn as sns
 
         fig, ax = plt.subplots(figsize=(6, 4))
         sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax)
         st.pyplot(fig)
 
+with tab4:
+    render_correlation_tab(filtered_df, filter_key)
+
 # ================= TAB 5 : HELP =================
-with tab5:
+@st.fragment
+def render_help_tab():
     st.subheader("📌 How to Use This Dashboard (Guidelines)")
 
     st.markdown("""
@@ -308,9 +488,13 @@ with tab5:
 📊 **Correlation** → Relationship between severity & weather numeric features  
 
 ✅ **Tip for Faster Maps**  
-- Reduce the **Map Points slider** to improve performance.
+- The **Hotspots Heatmap** is pre-aggregated and stays fast for any selection  
+- In **Marker Clusters** view, reduce the **Map Points slider** to improve performance.
 """)
 
+with tab5:
+    render_help_tab()
+
 # ================= FOOTER =================
 st.markdown("---")
 st.markdown("🚀 **Developed by Keerthi | Advanced Road Safety Analytics**")
@@ -0,0 +1 @@
+# Makes the top-level modules (analytics, prepare_data) importable from tests/
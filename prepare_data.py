@@ -0,0 +1,105 @@
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ================= PATHS =================
+CSV_PATH = "data/cleaned/US_Accidents_cleaned_sample_milestone1.csv"
+PARQUET_PATH = "data/cleaned/US_Accidents_cleaned_sample_milestone1.parquet"
+
+# Bump whenever build_parquet() changes what it writes (columns, dtypes, encoding)
+SCHEMA_VERSION = b"2"
+SCHEMA_KEY = b"road_accidents_schema"
+
+# ================= COLUMNS =================
+DAY_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+CATEGORY_COLS = ["State", "City", "Weather_Condition", "Day"]
+
+FLOAT_COLS = ["Visibility(mi)", "Temperature(F)", "Wind_Speed(mph)"]
+
+# Only the columns the dashboard reads (Date is derived from Start_Time at load time)
+USED_COLS = [
+    "Severity",
+    "Start_Time",
+    "Start_Lat",
+    "Start_Lng",
+    "City",
+    "State",
+    "Temperature(F)",
+    "Visibility(mi)",
+    "Wind_Speed(mph)",
+    "Weather_Condition",
+    "Hour",
+    "Month",
+    "Day",
+]
+
+
+# ================= BUILD PARQUET (ONE-SHOT) =================
+def build_parquet(csv_path=CSV_PATH, parquet_path=PARQUET_PATH):
+    df = pd.read_csv(csv_path)
+    df["Start_Time"] = pd.to_datetime(df["Start_Time"], errors="coerce")
+    df = df.dropna(subset=["Start_Time"])
+
+    df["Hour"] = df["Start_Time"].dt.hour.astype("int8")
+    df["Month"] = df["Start_Time"].dt.month.astype("int8")
+    df["Day"] = pd.Categorical(df["Start_Time"].dt.day_name(), categories=DAY_ORDER)
+
+    for col in CATEGORY_COLS:
+        df[col] = df[col].astype("category")
+
+    # ✅ Downcast numerics (int8 / float32) so every filter pass moves fewer bytes
+    df["Severity"] = pd.to_numeric(df["Severity"], downcast="integer")
+    for col in FLOAT_COLS:
+        df[col] = pd.to_numeric(df[col], downcast="float")
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # ✅ Dictionary-encode categoricals so they decode straight into pandas Categorical
+    schema = table.schema
+    for col in CATEGORY_COLS:
+        i = schema.get_field_index(col)
+        schema = schema.set(i, pa.field(col, pa.dictionary(pa.int16(), pa.string())))
+    table = table.cast(schema)
+
+    # ✅ Tag the file so a stale build is detected and rebuilt on load
+    metadata = dict(table.schema.metadata or {})
+    metadata[SCHEMA_KEY] = SCHEMA_VERSION
+    table = table.replace_schema_metadata(metadata)
+
+    # ✅ Write to a temp file in the same directory, then swap it in atomically,
+    # so an interrupted build never leaves a truncated Parquet file behind
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(parquet_path) or ".", suffix=".parquet.tmp"
+    )
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, parquet_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return parquet_path
+
+
+# ================= STALENESS CHECK =================
+def parquet_is_stale(csv_path=CSV_PATH, parquet_path=PARQUET_PATH):
+    # Missing, older than the CSV, or written by a different build_parquet() schema
+    if not os.path.exists(parquet_path):
+        return True
+    if os.path.getmtime(csv_path) > os.path.getmtime(parquet_path):
+        return True
+
+    try:
+        metadata = pq.read_schema(parquet_path).metadata or {}
+    except (pa.ArrowInvalid, OSError):
+        # Unreadable (e.g. truncated) file: rebuild it
+        return True
+    return metadata.get(SCHEMA_KEY) != SCHEMA_VERSION
+
+
+if __name__ == "__main__":
+    print(f"Wrote {build_parquet()}")
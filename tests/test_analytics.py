@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import build_count_cube, cube_aggregates, eda_aggregates
+from prepare_data import DAY_ORDER
+
+
+@pytest.fixture(scope="module")
+def df():
+    rng = np.random.default_rng(0)
+    n = 500
+    states = rng.choice(["CA", "OH", "TX", None], size=n, p=[0.4, 0.3, 0.25, 0.05])
+    return pd.DataFrame({
+        "State": pd.Categorical(states),
+        "Hour": rng.integers(0, 24, size=n).astype("int8"),
+        "Month": rng.integers(1, 13, size=n).astype("int8"),
+        # Alphabetical categories, to check days are matched by name
+        "Day": pd.Categorical(rng.choice(DAY_ORDER, size=n), categories=sorted(DAY_ORDER)),
+        # No severity 4 in the data
+        "Severity": rng.integers(1, 4, size=n).astype("int8"),
+    })
+
+
+def filter_rows(df, state, severity, day, hour_range, month_range):
+    mask = df["Hour"].between(*hour_range) & df["Month"].between(*month_range)
+    if state:
+        mask &= df["State"].isin(state)
+    if severity:
+        mask &= df["Severity"].isin(severity)
+    if day:
+        mask &= df["Day"].isin(day)
+    return df[mask]
+
+
+@pytest.mark.parametrize(
+    "state, severity, day, hour_range, month_range",
+    [
+        ([], [], [], (0, 23), (1, 12)),
+        (["CA", "TX"], [2, 3], [], (0, 23), (1, 12)),
+        (["OH"], [], ["Monday", "Sunday"], (6, 18), (3, 9)),
+        ([], [1], ["Friday"], (22, 23), (12, 12)),
+        (["ZZ"], [], [], (0, 23), (1, 12)),
+        (["CA"], [4], [], (0, 23), (1, 12)),
+    ],
+)
+def test_cube_matches_row_aggregates(df, state, severity, day, hour_range, month_range):
+    cube = build_count_cube(df)
+    expected = eda_aggregates(filter_rows(df, state, severity, day, hour_range, month_range))
+    got = cube_aggregates(cube, state, severity, day, hour_range, month_range)
+
+    np.testing.assert_array_equal(got.hour, expected.hour)
+    np.testing.assert_array_equal(got.day, expected.day)
+    np.testing.assert_array_equal(got.month, expected.month)
+    np.testing.assert_array_equal(got.state, expected.state)
+    np.testing.assert_array_equal(got.severity, expected.severity)
+    assert got.state_names == expected.state_names
+
+
+def test_cube_counts_every_row(df):
+    cube = build_count_cube(df)
+    assert cube.counts.sum() == len(df)